@@ -35,7 +35,7 @@ CREATE TABLE IF NOT EXISTS messages (
     content TEXT NOT NULL,
     audio_url VARCHAR(500), -- MinIO URL for audio
     transcription_url VARCHAR(500), -- MinIO URL for transcription
-    embedding vector(1536), -- OpenAI ada-002 is 1536 dimensions
+    embedding halfvec(1536), -- half-precision: 2 bytes/dim, plenty for cosine ranking
     tokens_used INTEGER DEFAULT 0,
     latency_ms INTEGER,
     metadata JSONB DEFAULT '{}'::jsonb,
@@ -47,7 +47,8 @@ CREATE INDEX idx_messages_created_at ON messages(created_at DESC);
 CREATE INDEX idx_messages_role ON messages(role);
 
 -- Vector similarity search index (HNSW - Hierarchical Navigable Small World)
-CREATE INDEX idx_messages_embedding ON messages USING hnsw (embedding vector_cosine_ops);
+CREATE INDEX idx_messages_embedding ON messages USING hnsw (embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 128);
 
 -- ============================================================
 -- MEMORY_FACTS TABLE
@@ -59,7 +60,7 @@ CREATE TABLE IF NOT EXISTS memory_facts (
     user_id VARCHAR(255) NOT NULL,
     fact_type VARCHAR(100) NOT NULL, -- 'preference', 'personal_info', 'context', 'instruction', etc.
     content TEXT NOT NULL,
-    embedding vector(1536),
+    embedding halfvec(1536),
     confidence_score FLOAT DEFAULT 1.0,
     source_message_id UUID REFERENCES messages(id) ON DELETE SET NULL,
     valid_from TIMESTAMP DEFAULT NOW(),
@@ -74,7 +75,8 @@ CREATE TABLE IF NOT EXISTS memory_facts (
 CREATE INDEX idx_memory_facts_user_id ON memory_facts(user_id);
 CREATE INDEX idx_memory_facts_type ON memory_facts(fact_type);
 CREATE INDEX idx_memory_facts_valid ON memory_facts(valid_from, valid_until);
-CREATE INDEX idx_memory_facts_embedding ON memory_facts USING hnsw (embedding vector_cosine_ops);
+CREATE INDEX idx_memory_facts_embedding ON memory_facts USING hnsw (embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 128);
 
 -- ============================================================
 -- VOICE_PROFILES TABLE
@@ -107,7 +109,7 @@ CREATE TABLE IF NOT EXISTS semantic_clusters (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     cluster_name VARCHAR(255) NOT NULL,
     user_id VARCHAR(255) NOT NULL,
-    centroid_embedding vector(1536),
+    centroid_embedding halfvec(1536),
     topic_keywords TEXT[],
     memory_count INTEGER DEFAULT 0,
     metadata JSONB DEFAULT '{}'::jsonb,
@@ -116,7 +118,8 @@ CREATE TABLE IF NOT EXISTS semantic_clusters (
 );
 
 CREATE INDEX idx_semantic_clusters_user_id ON semantic_clusters(user_id);
-CREATE INDEX idx_semantic_clusters_centroid ON semantic_clusters USING hnsw (centroid_embedding vector_cosine_ops);
+CREATE INDEX idx_semantic_clusters_centroid ON semantic_clusters USING hnsw (centroid_embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 128);
 
 -- ============================================================
 -- CLUSTER_MEMBERSHIPS TABLE
@@ -158,7 +161,7 @@ CREATE INDEX idx_interaction_analytics_timestamp ON interaction_analytics(timest
 
 -- Find similar messages by embedding
 CREATE OR REPLACE FUNCTION find_similar_messages(
-    query_embedding vector(1536),
+    query_embedding halfvec(1536),
     match_threshold float DEFAULT 0.7,
     match_count int DEFAULT 10
 )
@@ -169,25 +172,31 @@ RETURNS TABLE (
     similarity float
 )
 LANGUAGE plpgsql
+SET hnsw.ef_search = 80  -- co-tuned with index m=16/ef_construction=128
 AS $$
 BEGIN
+    -- Inner query orders by the raw distance operator with no
+    -- distance-based WHERE clause, so the HNSW index drives the scan;
+    -- the threshold is applied afterwards on the top-k candidates
     RETURN QUERY
-    SELECT
-        m.id,
-        m.conversation_id,
-        m.content,
-        1 - (m.embedding <=> query_embedding) as similarity
-    FROM messages m
-    WHERE m.embedding IS NOT NULL
-        AND 1 - (m.embedding <=> query_embedding) > match_threshold
-    ORDER BY m.embedding <=> query_embedding
-    LIMIT match_count;
+    SELECT * FROM (
+        SELECT
+            m.id,
+            m.conversation_id,
+            m.content,
+            -(m.embedding <#> query_embedding) as similarity
+        FROM messages m
+        WHERE m.embedding IS NOT NULL
+        ORDER BY m.embedding <#> query_embedding
+        LIMIT match_count
+    ) candidates
+    WHERE candidates.similarity > match_threshold;
 END;
 $$;
 
 -- Find similar memory facts
 CREATE OR REPLACE FUNCTION find_similar_facts(
-    query_embedding vector(1536),
+    query_embedding halfvec(1536),
     target_user_id VARCHAR(255),
     match_threshold float DEFAULT 0.7,
     match_count int DEFAULT 10
@@ -200,22 +209,28 @@ RETURNS TABLE (
     confidence_score float
 )
 LANGUAGE plpgsql
+SET hnsw.ef_search = 80  -- co-tuned with index m=16/ef_construction=128
 AS $$
 BEGIN
+    -- Same shape as find_similar_messages: keep distance out of the WHERE
+    -- clause so the planner can walk the HNSW index, then post-filter the
+    -- top-k candidates by the similarity threshold
     RETURN QUERY
-    SELECT
-        mf.id,
-        mf.content,
-        mf.fact_type,
-        1 - (mf.embedding <=> query_embedding) as similarity,
-        mf.confidence_score
-    FROM memory_facts mf
-    WHERE mf.user_id = target_user_id
-        AND mf.embedding IS NOT NULL
-        AND (mf.valid_until IS NULL OR mf.valid_until > NOW())
-        AND 1 - (mf.embedding <=> query_embedding) > match_threshold
-    ORDER BY mf.embedding <=> query_embedding
-    LIMIT match_count;
+    SELECT * FROM (
+        SELECT
+            mf.id,
+            mf.content,
+            mf.fact_type,
+            -(mf.embedding <#> query_embedding) as similarity,
+            mf.confidence_score
+        FROM memory_facts mf
+        WHERE mf.user_id = target_user_id
+            AND mf.embedding IS NOT NULL
+            AND (mf.valid_until IS NULL OR mf.valid_until > NOW())
+        ORDER BY mf.embedding <#> query_embedding
+        LIMIT match_count
+    ) candidates
+    WHERE candidates.similarity > match_threshold;
 END;
 $$;
 
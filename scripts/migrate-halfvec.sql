@@ -0,0 +1,100 @@
+-- Migrate existing embedding columns from vector(1536) to halfvec(1536)
+-- Run once against databases initialized before the halfvec schema change,
+-- then run migrate-ip-normalize.sql to finish the inner-product switch.
+-- halfvec stores 2 bytes/dim (vs 4), halving index size and memory traffic;
+-- half precision is more than enough for cosine ranking.
+-- Requires pgvector >= 0.7.0.
+
+BEGIN;
+
+-- Indexes must be dropped before the column type change and rebuilt after
+DROP INDEX IF EXISTS idx_messages_embedding;
+DROP INDEX IF EXISTS idx_memory_facts_embedding;
+DROP INDEX IF EXISTS idx_semantic_clusters_centroid;
+
+ALTER TABLE messages
+    ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536);
+ALTER TABLE memory_facts
+    ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536);
+ALTER TABLE semantic_clusters
+    ALTER COLUMN centroid_embedding TYPE halfvec(1536) USING centroid_embedding::halfvec(1536);
+
+-- Rebuild HNSW indexes with co-tuned build parameters
+CREATE INDEX idx_messages_embedding ON messages USING hnsw (embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 128);
+CREATE INDEX idx_memory_facts_embedding ON memory_facts USING hnsw (embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 128);
+CREATE INDEX idx_semantic_clusters_centroid ON semantic_clusters USING hnsw (centroid_embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 128);
+
+-- The deployed search functions still take vector(1536); replace them with
+-- the halfvec signatures. Cosine (<=>) stays correct for rows that are not
+-- unit-normalized yet; migrate-ip-normalize.sql switches them to <#>.
+CREATE OR REPLACE FUNCTION find_similar_messages(
+    query_embedding halfvec(1536),
+    match_threshold float DEFAULT 0.7,
+    match_count int DEFAULT 10
+)
+RETURNS TABLE (
+    id UUID,
+    conversation_id UUID,
+    content TEXT,
+    similarity float
+)
+LANGUAGE plpgsql
+SET hnsw.ef_search = 80  -- co-tuned with index m=16/ef_construction=128
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT * FROM (
+        SELECT
+            m.id,
+            m.conversation_id,
+            m.content,
+            1 - (m.embedding <=> query_embedding) as similarity
+        FROM messages m
+        WHERE m.embedding IS NOT NULL
+        ORDER BY m.embedding <=> query_embedding
+        LIMIT match_count
+    ) candidates
+    WHERE candidates.similarity > match_threshold;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION find_similar_facts(
+    query_embedding halfvec(1536),
+    target_user_id VARCHAR(255),
+    match_threshold float DEFAULT 0.7,
+    match_count int DEFAULT 10
+)
+RETURNS TABLE (
+    id UUID,
+    content TEXT,
+    fact_type VARCHAR(100),
+    similarity float,
+    confidence_score float
+)
+LANGUAGE plpgsql
+SET hnsw.ef_search = 80  -- co-tuned with index m=16/ef_construction=128
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT * FROM (
+        SELECT
+            mf.id,
+            mf.content,
+            mf.fact_type,
+            1 - (mf.embedding <=> query_embedding) as similarity,
+            mf.confidence_score
+        FROM memory_facts mf
+        WHERE mf.user_id = target_user_id
+            AND mf.embedding IS NOT NULL
+            AND (mf.valid_until IS NULL OR mf.valid_until > NOW())
+        ORDER BY mf.embedding <=> query_embedding
+        LIMIT match_count
+    ) candidates
+    WHERE candidates.similarity > match_threshold;
+END;
+$$;
+
+COMMIT;
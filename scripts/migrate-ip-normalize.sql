@@ -0,0 +1,102 @@
+-- Normalize existing embeddings and move HNSW indexes to inner product
+-- Run once against databases initialized before the inner-product change.
+-- The service unit-normalizes embeddings at write time, so the negative
+-- inner product (<#>) equals cosine similarity while being cheaper to
+-- evaluate per candidate. Requires pgvector >= 0.7.0 (l2_normalize).
+-- Redis needs no flushing: the service's versioned embedding cache prefix
+-- (embedding:v2:) turns entries written by pre-change code into misses.
+
+BEGIN;
+
+DROP INDEX IF EXISTS idx_messages_embedding;
+DROP INDEX IF EXISTS idx_memory_facts_embedding;
+DROP INDEX IF EXISTS idx_semantic_clusters_centroid;
+
+-- Rows written before this change are not unit-length yet
+UPDATE messages
+    SET embedding = l2_normalize(embedding)
+    WHERE embedding IS NOT NULL;
+UPDATE memory_facts
+    SET embedding = l2_normalize(embedding)
+    WHERE embedding IS NOT NULL;
+UPDATE semantic_clusters
+    SET centroid_embedding = l2_normalize(centroid_embedding)
+    WHERE centroid_embedding IS NOT NULL;
+
+CREATE INDEX idx_messages_embedding ON messages USING hnsw (embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 128);
+CREATE INDEX idx_memory_facts_embedding ON memory_facts USING hnsw (embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 128);
+CREATE INDEX idx_semantic_clusters_centroid ON semantic_clusters USING hnsw (centroid_embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 128);
+
+-- Replace the deployed search functions so they rank by inner product;
+-- existing databases never re-run init-db.sql
+CREATE OR REPLACE FUNCTION find_similar_messages(
+    query_embedding halfvec(1536),
+    match_threshold float DEFAULT 0.7,
+    match_count int DEFAULT 10
+)
+RETURNS TABLE (
+    id UUID,
+    conversation_id UUID,
+    content TEXT,
+    similarity float
+)
+LANGUAGE plpgsql
+SET hnsw.ef_search = 80  -- co-tuned with index m=16/ef_construction=128
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT * FROM (
+        SELECT
+            m.id,
+            m.conversation_id,
+            m.content,
+            -(m.embedding <#> query_embedding) as similarity
+        FROM messages m
+        WHERE m.embedding IS NOT NULL
+        ORDER BY m.embedding <#> query_embedding
+        LIMIT match_count
+    ) candidates
+    WHERE candidates.similarity > match_threshold;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION find_similar_facts(
+    query_embedding halfvec(1536),
+    target_user_id VARCHAR(255),
+    match_threshold float DEFAULT 0.7,
+    match_count int DEFAULT 10
+)
+RETURNS TABLE (
+    id UUID,
+    content TEXT,
+    fact_type VARCHAR(100),
+    similarity float,
+    confidence_score float
+)
+LANGUAGE plpgsql
+SET hnsw.ef_search = 80  -- co-tuned with index m=16/ef_construction=128
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT * FROM (
+        SELECT
+            mf.id,
+            mf.content,
+            mf.fact_type,
+            -(mf.embedding <#> query_embedding) as similarity,
+            mf.confidence_score
+        FROM memory_facts mf
+        WHERE mf.user_id = target_user_id
+            AND mf.embedding IS NOT NULL
+            AND (mf.valid_until IS NULL OR mf.valid_until > NOW())
+        ORDER BY mf.embedding <#> query_embedding
+        LIMIT match_count
+    ) candidates
+    WHERE candidates.similarity > match_threshold;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,614 @@
+"""
+Agent Memz Memory Service (async)
+Non-blocking variant of MemoryService for asyncio-based voice agents
+Uses asyncpg, redis.asyncio and Cohere's AsyncClient so concurrent
+sessions overlap their network I/O instead of serializing on it
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import BinaryIO, List, Dict, Optional, Union
+
+import numpy as np
+
+import asyncpg
+from pgvector import HalfVector
+from pgvector.asyncpg import register_vector
+import redis.asyncio as aioredis
+from minio import Minio
+from minio.error import S3Error
+
+import cohere
+
+from .memory_service import (
+    read_secret,
+    _CYPHER_CREATE_NODES,
+    _CYPHER_CREATE_RELATIONSHIPS,
+    _CYPHER_WRAPPER,
+    _graph_identifier,
+    cosine_similarities,
+    LRUCache,
+    TokenBucket,
+    _hash_key,
+    EMBEDDING_CACHE_PREFIX,
+    EMBED_BATCH_MAX,
+    EMBED_REQUESTS_PER_MINUTE,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+)
+
+
+async def _init_pg_connection(conn: asyncpg.Connection):
+    """
+    One-time setup for each pooled connection: register binary pgvector
+    codecs (embeddings cross the wire as packed floats, not text) and load
+    the AGE extension so graph calls don't repeat LOAD/SET per query
+    """
+    await register_vector(conn)
+    # jsonb codec lets callers pass dicts straight through without a
+    # json.dumps at every call site
+    await conn.set_type_codec(
+        'jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog'
+    )
+    try:
+        await conn.execute("LOAD 'age';")
+        await conn.execute("SET search_path = ag_catalog, '$user', public;")
+        # agtype has no binary codec; move it through its text form so
+        # Cypher parameter maps can be bound as JSON strings
+        await conn.set_type_codec(
+            'agtype', schema='ag_catalog',
+            encoder=str, decoder=str, format='text'
+        )
+    except asyncpg.PostgresError:
+        # AGE not installed in this deployment; graph methods will fail
+        # with a clear error if actually used
+        pass
+
+
+class AsyncMemoryService:
+    """Async counterpart of MemoryService with the same method surface"""
+
+    def __init__(self):
+        # Use AsyncMemoryService.create() instead of constructing directly
+        self.pg_pool: Optional[asyncpg.Pool] = None
+        self.redis_client: Optional[aioredis.Redis] = None
+        self.minio_client: Optional[Minio] = None
+        self.cohere_client: Optional[cohere.AsyncClient] = None
+
+    @classmethod
+    async def create(cls) -> 'AsyncMemoryService':
+        """Create a service instance with all connections established"""
+        self = cls()
+
+        postgres_password = read_secret(
+            'postgres_password', os.getenv('POSTGRES_PASSWORD', 'devpassword')
+        )
+        self.pg_pool = await asyncpg.create_pool(
+            host=os.getenv('POSTGRES_HOST', 'localhost'),
+            port=int(os.getenv('POSTGRES_PORT', '5432')),
+            database=os.getenv('POSTGRES_DB', 'agent_memory'),
+            user=os.getenv('POSTGRES_USER', 'agentmemz'),
+            password=postgres_password,
+            min_size=2,
+            max_size=20,
+            init=_init_pg_connection
+        )
+
+        self.redis_client = aioredis.Redis(
+            connection_pool=aioredis.ConnectionPool(
+                host=os.getenv('REDIS_HOST', 'localhost'),
+                port=int(os.getenv('REDIS_PORT', '6379')),
+                max_connections=50,
+                decode_responses=False
+            )
+        )
+
+        minio_password = read_secret(
+            'minio_password', os.getenv('MINIO_ROOT_PASSWORD', 'minioadmin123')
+        )
+        self.minio_client = Minio(
+            os.getenv('MINIO_ENDPOINT', 'localhost:9000'),
+            access_key=os.getenv('MINIO_ROOT_USER', 'minioadmin'),
+            secret_key=minio_password,
+            secure=os.getenv('MINIO_SECURE', 'false').lower() == 'true'
+        )
+
+        cohere_key = read_secret('cohere_api_key', os.getenv('COHERE_API_KEY'))
+        self.cohere_client = cohere.AsyncClient(api_key=cohere_key) if cohere_key else None
+
+        # L1 in-process caches in front of Redis (see MemoryService)
+        self._embedding_l1 = LRUCache(maxsize=2048)
+        self._session_l1 = LRUCache(maxsize=1024)
+
+        # Keeps bursts of embedding calls under the API rate limit
+        self._embed_bucket = TokenBucket(
+            rate=EMBED_REQUESTS_PER_MINUTE / 60.0,
+            capacity=10.0
+        )
+
+        return self
+
+    async def generate_embeddings(
+        self,
+        texts: List[str],
+        use_cache: bool = True
+    ) -> List[List[float]]:
+        """
+        Generate embedding vectors for a batch of texts using Cohere
+        Same caching scheme as the sync service: one MGET for the batch,
+        one API call for the misses, one pipelined write-back
+        """
+        cache_keys = [
+            EMBEDDING_CACHE_PREFIX + _hash_key(text.encode())
+            for text in texts
+        ]
+
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        misses = list(range(len(texts)))
+
+        # L1: in-process LRU, no network at all for hot texts
+        if use_cache:
+            misses = []
+            for i, key in enumerate(cache_keys):
+                hit = self._embedding_l1.get(key)
+                if hit is not None:
+                    embeddings[i] = hit
+                else:
+                    misses.append(i)
+
+        # L2: Redis (one round-trip for all remaining misses)
+        if use_cache and misses:
+            redis_misses = []
+            cached_values = await self.redis_client.mget(
+                [cache_keys[i] for i in misses]
+            )
+            for i, cached in zip(misses, cached_values):
+                if cached:
+                    embeddings[i] = np.frombuffer(
+                        cached, dtype=np.float16
+                    ).astype(np.float32).tolist()
+                    self._embedding_l1.put(cache_keys[i], embeddings[i])
+                else:
+                    redis_misses.append(i)
+            misses = redis_misses
+
+        if misses:
+            # Chunked to the API's batch limit, each request gated by the
+            # token bucket so bursts stay under the rate limit
+            fresh = []
+            for start in range(0, len(misses), EMBED_BATCH_MAX):
+                chunk = misses[start:start + EMBED_BATCH_MAX]
+                wait = self._embed_bucket.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                response = await self.cohere_client.embed(
+                    texts=[texts[i] for i in chunk],
+                    model="embed-multilingual-v3.0",
+                    input_type="search_document",
+                    embedding_types=["float"]
+                )
+                fresh.extend(response.embeddings.float)
+            # Unit-normalize once at write time (see MemoryService)
+            for i, embedding in zip(misses, fresh):
+                vec = np.asarray(embedding, dtype=np.float32)
+                embeddings[i] = (vec / (np.linalg.norm(vec) + 1e-12)).tolist()
+
+            if use_cache:
+                pipe = self.redis_client.pipeline()
+                for i in misses:
+                    self._embedding_l1.put(cache_keys[i], embeddings[i])
+                    pipe.setex(
+                        cache_keys[i],
+                        7 * 24 * 60 * 60,
+                        np.asarray(embeddings[i], dtype=np.float16).tobytes()
+                    )
+                await pipe.execute()
+
+        return embeddings
+
+    async def generate_embedding(self, text: str, use_cache: bool = True) -> List[float]:
+        """Generate embedding vector for a single text using Cohere"""
+        return (await self.generate_embeddings([text], use_cache=use_cache))[0]
+
+    async def store_audio(
+        self,
+        user_id: str,
+        session_id: str,
+        audio_data: Union[bytes, BinaryIO],
+        filename: str = None
+    ) -> str:
+        """
+        Store audio file in MinIO
+        Accepts raw bytes or a readable binary stream; streams upload in
+        10 MB multipart chunks instead of buffering the whole recording
+        The MinIO client is blocking, so the upload runs in a thread
+        """
+        if filename is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"{timestamp}.wav"
+
+        object_name = f"{user_id}/{session_id}/{filename}"
+        bucket_name = "audio-recordings"
+
+        def _upload():
+            if isinstance(audio_data, (bytes, bytearray)):
+                self.minio_client.put_object(
+                    bucket_name,
+                    object_name,
+                    BytesIO(audio_data),
+                    length=len(audio_data),
+                    content_type='audio/wav'
+                )
+            else:
+                self.minio_client.put_object(
+                    bucket_name,
+                    object_name,
+                    audio_data,
+                    length=-1,
+                    part_size=10 * 1024 * 1024,
+                    content_type='audio/wav'
+                )
+
+        try:
+            await asyncio.to_thread(_upload)
+            return await self.get_audio_url(object_name, bucket_name)
+        except S3Error as e:
+            print(f"Error uploading audio: {e}")
+            raise
+
+    async def get_audio_url(
+        self,
+        object_name: str,
+        bucket_name: str = "audio-recordings"
+    ) -> str:
+        """
+        Get a presigned GET URL for a stored audio object
+        Cached in Redis for 6 days, same scheme as the sync service
+        """
+        cache_key = f"audio_url:{bucket_name}/{object_name}"
+        cached = await self.redis_client.get(cache_key)
+        if cached:
+            return cached.decode()
+
+        url = await asyncio.to_thread(
+            self.minio_client.presigned_get_object,
+            bucket_name,
+            object_name,
+            expires=timedelta(days=7)
+        )
+        await self.redis_client.setex(cache_key, 6 * 24 * 60 * 60, url)
+        return url
+
+    async def create_conversation(
+        self,
+        user_id: str,
+        session_id: str,
+        metadata: Dict = None
+    ) -> str:
+        """Create a new conversation session"""
+        async with self.pg_pool.acquire() as conn:
+            conversation_id = await conn.fetchval("""
+                INSERT INTO conversations (user_id, session_id, metadata)
+                VALUES ($1, $2, $3)
+                RETURNING id
+            """, user_id, session_id, metadata or {})
+
+        # Cache active session in Redis
+        session_key = f"session:{session_id}"
+        pipe = self.redis_client.pipeline()
+        pipe.hset(session_key, mapping={
+            'user_id': user_id,
+            'conversation_id': str(conversation_id),
+            'started_at': datetime.now().isoformat()
+        })
+        pipe.expire(session_key, 3600)  # 1 hour TTL
+        await pipe.execute()
+
+        return str(conversation_id)
+
+    async def add_message(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        audio_url: Optional[str] = None,
+        metadata: Dict = None
+    ) -> Dict:
+        """
+        Add a message to a conversation
+        Automatically generates and stores embedding
+        """
+        embedding = await self.generate_embedding(content)
+
+        async with self.pg_pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                INSERT INTO messages (
+                    conversation_id,
+                    role,
+                    content,
+                    audio_url,
+                    embedding,
+                    metadata
+                )
+                VALUES ($1::uuid, $2, $3, $4, $5, $6)
+                RETURNING id, created_at
+            """,
+                conversation_id,
+                role,
+                content,
+                audio_url,
+                HalfVector(embedding),
+                metadata or {}
+            )
+
+        return {
+            'message_id': str(row['id']),
+            'created_at': row['created_at'].isoformat()
+        }
+
+    async def extract_and_store_facts(
+        self,
+        user_id: str,
+        content: str,
+        message_id: str,
+        fact_type: str = 'context'
+    ) -> List[str]:
+        """
+        Extract facts from content and store in memory_facts table
+        In production, use NLP/LLM for fact extraction
+        This is a simplified example
+        """
+        # TODO: Implement sophisticated fact extraction
+        # For now, store the entire content as a fact
+        facts = [content]  # Replace with actual extraction logic
+
+        embeddings = await self.generate_embeddings(facts)
+
+        # Single statement for the whole batch via unnest
+        async with self.pg_pool.acquire() as conn:
+            rows = await conn.fetch("""
+                INSERT INTO memory_facts (
+                    user_id,
+                    fact_type,
+                    content,
+                    embedding,
+                    source_message_id
+                )
+                SELECT $1, $2, f.content, f.embedding, $3::uuid
+                FROM unnest($4::text[], $5::halfvec[]) AS f(content, embedding)
+                RETURNING id
+            """,
+                user_id,
+                fact_type,
+                message_id,
+                facts,
+                [HalfVector(e) for e in embeddings]
+            )
+
+        return [str(row['id']) for row in rows]
+
+    async def find_similar_memories(
+        self,
+        query: str,
+        user_id: str,
+        threshold: float = 0.7,
+        limit: int = 10,
+        use_cache: bool = True
+    ) -> List[Dict]:
+        """
+        Find similar memories using vector similarity search
+        Uses hybrid approach: cache -> semantic cache -> vector search
+        """
+        query_hash = _hash_key(user_id.encode() + b"\0" + query.encode())
+        cache_key = f"query:{query_hash}"
+
+        if use_cache:
+            cached = await self.redis_client.get(cache_key)
+            if cached:
+                return json.loads(cached)
+
+        query_embedding = await self.generate_embedding(query)
+
+        if use_cache:
+            cached_memories = await self._semantic_cache_lookup(user_id, query_embedding)
+            if cached_memories is not None:
+                await self._update_facts_access([m['id'] for m in cached_memories])
+                return cached_memories
+
+        async with self.pg_pool.acquire() as conn:
+            results = await conn.fetch("""
+                SELECT * FROM find_similar_facts(
+                    $1,
+                    $2,
+                    $3,
+                    $4
+                )
+            """, HalfVector(query_embedding), user_id, threshold, limit)
+
+        memories = [
+            {
+                'id': str(row['id']),
+                'content': row['content'],
+                'fact_type': row['fact_type'],
+                'similarity': float(row['similarity']),
+                'confidence': float(row['confidence_score'])
+            }
+            for row in results
+        ]
+
+        if use_cache:
+            sem_key = f"semcache:{user_id}"
+            pipe = self.redis_client.pipeline()
+            pipe.setex(cache_key, 3600, json.dumps(memories))
+            pipe.hset(
+                sem_key,
+                query_hash,
+                np.asarray(query_embedding, dtype=np.float16).tobytes()
+            )
+            pipe.expire(sem_key, 3600)
+            await pipe.execute()
+
+        await self._update_facts_access([m['id'] for m in memories])
+
+        return memories
+
+    async def _semantic_cache_lookup(
+        self,
+        user_id: str,
+        query_embedding: List[float]
+    ) -> Optional[List[Dict]]:
+        """Look up cached results for a semantically equivalent recent query"""
+        sem_key = f"semcache:{user_id}"
+        entries = await self.redis_client.hgetall(sem_key)
+        if not entries:
+            return None
+
+        if len(entries) > SEMANTIC_CACHE_MAX_ENTRIES:
+            await self.redis_client.delete(sem_key)
+            return None
+
+        hashes = list(entries.keys())
+        similarities = cosine_similarities(
+            query_embedding, [entries[h] for h in hashes]
+        )
+
+        best = int(np.argmax(similarities))
+        if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+            return None
+
+        cached = await self.redis_client.get(f"query:{hashes[best].decode()}")
+        if cached:
+            return json.loads(cached)
+        return None
+
+    async def _update_facts_access(self, fact_ids: List[str]):
+        """Update access count and timestamp for a batch of facts"""
+        if not fact_ids:
+            return
+        async with self.pg_pool.acquire() as conn:
+            await conn.execute("""
+                UPDATE memory_facts
+                SET access_count = access_count + 1,
+                    last_accessed = NOW()
+                WHERE id = ANY($1::uuid[])
+            """, fact_ids)
+
+    async def get_session_context(self, session_id: str) -> Optional[Dict]:
+        """Get current session context from Redis (with short-TTL L1)"""
+        session_key = f"session:{session_id}"
+
+        context = self._session_l1.get(session_key)
+        if context is not None:
+            return context
+
+        session_data = await self.redis_client.hgetall(session_key)
+
+        if not session_data:
+            return None
+
+        context = {
+            k.decode(): v.decode()
+            for k, v in session_data.items()
+        }
+        # Short TTL: other workers may rewrite the session behind our back
+        self._session_l1.put(session_key, context, ttl=30)
+        return context
+
+    async def update_session_context(
+        self,
+        session_id: str,
+        context_updates: Dict
+    ):
+        """Update session context in Redis"""
+        session_key = f"session:{session_id}"
+        pipe = self.redis_client.pipeline()
+        pipe.hset(
+            session_key,
+            mapping={
+                k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
+                for k, v in context_updates.items()
+            }
+        )
+        pipe.expire(session_key, 3600)
+        await pipe.execute()
+        self._session_l1.invalidate(session_key)
+
+    async def get_user_memory_summary(self, user_id: str) -> Dict:
+        """Get summary statistics about user's memories"""
+        async with self.pg_pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT * FROM user_memory_summary
+                WHERE user_id = $1
+            """, user_id)
+
+        if not row:
+            return {
+                'user_id': user_id,
+                'total_facts': 0,
+                'fact_types': 0,
+                'avg_confidence': 0.0,
+                'last_updated': None
+            }
+
+        return dict(row)
+
+    async def create_graph_nodes_and_relationships(
+        self,
+        fact_id: str,
+        entities: List[Dict],
+        relationships: List[Dict]
+    ):
+        """
+        Create graph nodes and relationships using Apache AGE
+        Same batched UNWIND-per-label/type scheme as the sync service,
+        with properties and ids passed as Cypher parameters
+        """
+        async with self.pg_pool.acquire() as conn:
+            async with conn.transaction():
+                # Create nodes for entities, one statement per label
+                nodes_by_label: Dict[str, List[Dict]] = {}
+                for entity in entities:
+                    properties = dict(entity.get('properties', {}))
+                    properties['fact_id'] = fact_id
+                    nodes_by_label.setdefault(
+                        _graph_identifier(entity['type']), []
+                    ).append(properties)
+
+                for label, rows in nodes_by_label.items():
+                    await conn.fetch(
+                        _CYPHER_CREATE_NODES.format(label=label, param='$1'),
+                        json.dumps({'rows': rows})
+                    )
+
+                # Create relationships, one statement per type
+                rels_by_type: Dict[str, List[Dict]] = {}
+                for rel in relationships:
+                    rels_by_type.setdefault(
+                        _graph_identifier(rel['type']), []
+                    ).append({'from_id': rel['from'], 'to_id': rel['to']})
+
+                for rel_type, rows in rels_by_type.items():
+                    await conn.fetch(
+                        _CYPHER_CREATE_RELATIONSHIPS.format(
+                            rel_type=rel_type, param='$1'
+                        ),
+                        json.dumps({'rows': rows})
+                    )
+
+    async def query_graph(self, cypher_query: str) -> List[Dict]:
+        """
+        Execute a Cypher query on the knowledge graph
+        Returns results as list of dictionaries
+        """
+        async with self.pg_pool.acquire() as conn:
+            results = await conn.fetch(_CYPHER_WRAPPER.format(query=cypher_query))
+
+            return [dict(row) for row in results]
+
+    async def close(self):
+        """Close all connections"""
+        await self.pg_pool.close()
+        await self.redis_client.aclose()
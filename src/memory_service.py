@@ -6,14 +6,23 @@ A first-class memory backend for voice agents
 import os
 import hashlib
 import json
-from datetime import datetime
-from typing import List, Dict, Optional, Any
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import BinaryIO, List, Dict, Optional, Any, Union
 import numpy as np
 from pathlib import Path
 
 # Database and caching
 import psycopg2
-from psycopg2.extras import execute_values, RealDictCursor
+from psycopg2.extras import execute_values, Json, RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from pgvector import HalfVector
+from pgvector.psycopg2 import register_vector
 import redis
 from minio import Minio
 from minio.error import S3Error
@@ -21,6 +30,19 @@ from minio.error import S3Error
 # For embeddings generation using Cohere
 import cohere
 
+# BLAKE3 uses AVX2/AVX-512 SIMD and is far faster than MD5 for cache keys;
+# fall back to blake2b (still faster than md5) if the extension isn't installed
+try:
+    from blake3 import blake3 as _blake3
+
+    def _hash_key(data: bytes) -> str:
+        """Hash bytes to a 128-bit hex cache key"""
+        return _blake3(data).hexdigest(length=16)
+except ImportError:
+    def _hash_key(data: bytes) -> str:
+        """Hash bytes to a 128-bit hex cache key"""
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
 
 def read_secret(secret_name: str, default: str = None) -> str:
     """
@@ -43,37 +65,274 @@ def read_secret(secret_name: str, default: str = None) -> str:
     return os.getenv(env_name, default)
 
 
+# Semantic query cache: reuse cached results when a new query's embedding
+# is at least this similar to a recently cached one
+SEMANTIC_CACHE_THRESHOLD = 0.97
+SEMANTIC_CACHE_MAX_ENTRIES = 256
+
+# Embedding cache key prefix, versioned so entries written under older
+# representations (v1: un-normalized JSON/float blobs) become misses
+# instead of feeding stale vectors into inner-product ranking
+EMBEDDING_CACHE_PREFIX = "embedding:v2:"
+
+# Cohere embed API limits: at most 96 texts per request, and production
+# keys allow ~100 requests/minute
+EMBED_BATCH_MAX = 96
+EMBED_REQUESTS_PER_MINUTE = int(os.getenv('EMBED_REQUESTS_PER_MINUTE', '100'))
+
+
+# Cypher statement templates shared by the graph methods, assembled once at
+# import time. Labels and relationship types are structural in Cypher and
+# must be interpolated, so they pass through _graph_identifier first; all
+# values travel in the agtype parameter map ({param} is the driver's
+# placeholder: %s for psycopg2, $1 for asyncpg), never in the query text
+_CYPHER_CREATE_NODES = """
+    SELECT * FROM cypher('memory_graph', $$
+        UNWIND $rows AS row
+        CREATE (n:{label})
+        SET n = row
+        RETURN n
+    $$, {param}::agtype) as (n agtype);
+"""
+
+_CYPHER_CREATE_RELATIONSHIPS = """
+    SELECT * FROM cypher('memory_graph', $$
+        UNWIND $rows AS row
+        MATCH (a {{id: row.from_id}}), (b {{id: row.to_id}})
+        CREATE (a)-[r:{rel_type}]->(b)
+        RETURN r
+    $$, {param}::agtype) as (r agtype);
+"""
+
+_CYPHER_WRAPPER = """
+    SELECT * FROM cypher('memory_graph', $$
+        {query}
+    $$) as (result agtype);
+"""
+
+_GRAPH_IDENTIFIER_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+
+
+def _graph_identifier(name: str) -> str:
+    """Whitelist a Cypher label or relationship type before interpolation"""
+    if not _GRAPH_IDENTIFIER_RE.match(name):
+        raise ValueError(f"Invalid graph label or relationship type: {name!r}")
+    return name
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket for rate-limiting outbound API calls
+    reserve() returns the wait time instead of sleeping, so async callers
+    can await it; acquire() is the blocking convenience for sync code
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._timestamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens and return how long to wait before proceeding"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity,
+                self._tokens + (now - self._timestamp) * self._rate
+            )
+            self._timestamp = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until the requested tokens are available"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU used as an L1 in front of Redis
+    Saves a network round-trip for hot keys; entries can carry a TTL for
+    data that other processes may rewrite (e.g. session context)
+    """
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl: Optional[float] = None):
+        with self._lock:
+            expires_at = time.monotonic() + ttl if ttl is not None else None
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            if len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+# Optional Numba JIT for the similarity kernel; the NumPy expression below
+# is the fallback when numba isn't installed
+try:
+    from numba import njit
+
+    @njit(cache=True, fastmath=True)
+    def _cosine_kernel(candidates, query_vec):  # pragma: no cover
+        n = candidates.shape[0]
+        out = np.empty(n, dtype=np.float32)
+        q_norm = np.sqrt(np.dot(query_vec, query_vec))
+        for i in range(n):
+            dot = np.float32(0.0)
+            norm = np.float32(0.0)
+            for j in range(candidates.shape[1]):
+                dot += candidates[i, j] * query_vec[j]
+                norm += candidates[i, j] * candidates[i, j]
+            out[i] = dot / (np.sqrt(norm) * q_norm + 1e-9)
+        return out
+except ImportError:
+    _cosine_kernel = None
+
+
+def cosine_similarities(
+    query_embedding: List[float],
+    candidate_blobs: List[bytes]
+) -> np.ndarray:
+    """
+    Cosine similarity of a query embedding against candidate vectors
+    stored as raw float16 blobs
+    The blobs are joined and decoded with a single np.frombuffer (one
+    memcpy); the math runs through a Numba-compiled kernel when available,
+    otherwise a vectorized NumPy expression
+    """
+    candidates = np.frombuffer(b''.join(candidate_blobs), dtype=np.float16)
+    candidates = candidates.reshape(len(candidate_blobs), -1).astype(np.float32)
+
+    query_vec = np.asarray(query_embedding, dtype=np.float32)
+
+    if _cosine_kernel is not None:
+        return _cosine_kernel(candidates, query_vec)
+
+    return candidates @ query_vec / (
+        np.linalg.norm(candidates, axis=1) * np.linalg.norm(query_vec) + 1e-9
+    )
+
+
+class _PooledConnection(psycopg2.extensions.connection):
+    """
+    Connection class for the pool that can carry one-time setup flags
+    (plain psycopg2 connections are C objects without a __dict__, so
+    attributes can't be set on them directly)
+    """
+
+    _vector_registered = False
+    _age_loaded = False
+    _stmts_prepared = False
+
+
 class MemoryService:
     """Main service for managing voice agent memory"""
 
+    # Hot statements prepared once per pooled connection, so Postgres
+    # reuses the parsed plan instead of re-planning on every call
+    # (asyncpg prepares automatically; psycopg2 needs explicit PREPARE)
+    _PREPARED_STATEMENTS = (
+        """PREPARE find_facts (halfvec, text, float, int) AS
+           SELECT * FROM find_similar_facts($1, $2, $3, $4)""",
+        """PREPARE touch_facts (uuid[]) AS
+           UPDATE memory_facts
+           SET access_count = access_count + 1,
+               last_accessed = NOW()
+           WHERE id = ANY($1)""",
+    )
+
     def __init__(self):
-        # Initialize connections
-        self.pg_conn = self._init_postgres()
+        # Initialize connection pools
+        self.pg_pool = self._init_postgres()
         self.redis_client = self._init_redis()
         self.minio_client = self._init_minio()
         # Read Cohere API key from Docker secret or env var
         cohere_key = read_secret('cohere_api_key', os.getenv('COHERE_API_KEY'))
         self.cohere_client = cohere.Client(api_key=cohere_key) if cohere_key else None
 
-    def _init_postgres(self) -> psycopg2.extensions.connection:
-        """Initialize PostgreSQL connection"""
+        # L1 in-process caches in front of Redis: embeddings are immutable
+        # (content-addressed), session context gets a short TTL since other
+        # workers may rewrite it
+        self._embedding_l1 = LRUCache(maxsize=2048)
+        self._session_l1 = LRUCache(maxsize=1024)
+
+        # Keeps bursts of embedding calls under the API rate limit
+        self._embed_bucket = TokenBucket(
+            rate=EMBED_REQUESTS_PER_MINUTE / 60.0,
+            capacity=10.0
+        )
+
+    def _init_postgres(self) -> ThreadedConnectionPool:
+        """Initialize PostgreSQL connection pool"""
         # Read password from Docker secret or env var
         postgres_password = read_secret('postgres_password', os.getenv('POSTGRES_PASSWORD', 'devpassword'))
 
-        return psycopg2.connect(
+        return ThreadedConnectionPool(
+            minconn=2,
+            maxconn=20,
             host=os.getenv('POSTGRES_HOST', 'localhost'),
             port=os.getenv('POSTGRES_PORT', '5432'),
             database=os.getenv('POSTGRES_DB', 'agent_memory'),
             user=os.getenv('POSTGRES_USER', 'agentmemz'),
-            password=postgres_password
+            password=postgres_password,
+            connection_factory=_PooledConnection
         )
 
+    @contextmanager
+    def _conn(self):
+        """Borrow a connection from the pool and return it when done"""
+        conn = self.pg_pool.getconn()
+        try:
+            # One-time per-connection setup: pgvector adapters let us pass
+            # vectors directly instead of formatting them in Python
+            if not conn._vector_registered:
+                register_vector(conn)
+                conn._vector_registered = True
+            yield conn
+            # Read paths never commit; end their implicit transaction so
+            # the connection goes back idle (no-op right after a commit)
+            conn.rollback()
+        except Exception:
+            # Never hand an aborted transaction to the next borrower
+            conn.rollback()
+            raise
+        finally:
+            self.pg_pool.putconn(conn)
+
     def _init_redis(self) -> redis.Redis:
-        """Initialize Redis connection"""
+        """Initialize Redis client backed by a connection pool"""
         return redis.Redis(
-            host=os.getenv('REDIS_HOST', 'localhost'),
-            port=int(os.getenv('REDIS_PORT', '6379')),
-            decode_responses=False  # We'll handle binary data
+            connection_pool=redis.ConnectionPool(
+                host=os.getenv('REDIS_HOST', 'localhost'),
+                port=int(os.getenv('REDIS_PORT', '6379')),
+                max_connections=50,
+                decode_responses=False  # We'll handle binary data
+            )
         )
 
     def _init_minio(self) -> Minio:
@@ -88,49 +347,104 @@ class MemoryService:
             secure=os.getenv('MINIO_SECURE', 'false').lower() == 'true'
         )
 
-    def generate_embedding(self, text: str, use_cache: bool = True) -> List[float]:
+    def generate_embeddings(
+        self,
+        texts: List[str],
+        use_cache: bool = True
+    ) -> List[List[float]]:
         """
-        Generate embedding vector for text using Cohere
-        Uses Redis cache to avoid redundant API calls
+        Generate embedding vectors for a batch of texts using Cohere
+        Checks the Redis cache for all texts in a single MGET, then sends
+        only the misses to the API in one batched call
         """
-        # Create hash of text for caching
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        cache_key = f"embedding:{text_hash}"
-
-        # Check cache first
-        if use_cache:
-            cached = self.redis_client.get(cache_key)
-            if cached:
-                return json.loads(cached)
+        cache_keys = [
+            EMBEDDING_CACHE_PREFIX + _hash_key(text.encode())
+            for text in texts
+        ]
 
-        # Generate embedding via Cohere (v3 multilingual model)
-        response = self.cohere_client.embed(
-            texts=[text],
-            model="embed-multilingual-v3.0",
-            input_type="search_document",
-            embedding_types=["float"]
-        )
-        embedding = response.embeddings.float[0]
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        misses = list(range(len(texts)))
 
-        # Cache for 7 days
+        # L1: in-process LRU, no network at all for hot texts
         if use_cache:
-            self.redis_client.setex(
-                cache_key,
-                7 * 24 * 60 * 60,
-                json.dumps(embedding)
-            )
+            misses = []
+            for i, key in enumerate(cache_keys):
+                hit = self._embedding_l1.get(key)
+                if hit is not None:
+                    embeddings[i] = hit
+                else:
+                    misses.append(i)
+
+        # L2: Redis (one round-trip for all remaining misses)
+        # Entries are raw float16 blobs (matching the halfvec columns):
+        # np.frombuffer is a zero-copy read, vs. json.loads building one
+        # PyFloat per dimension
+        if use_cache and misses:
+            redis_misses = []
+            cached_values = self.redis_client.mget([cache_keys[i] for i in misses])
+            for i, cached in zip(misses, cached_values):
+                if cached:
+                    embeddings[i] = np.frombuffer(
+                        cached, dtype=np.float16
+                    ).astype(np.float32).tolist()
+                    self._embedding_l1.put(cache_keys[i], embeddings[i])
+                else:
+                    redis_misses.append(i)
+            misses = redis_misses
+
+        if misses:
+            # Generate embeddings via Cohere (v3 multilingual model)
+            # Chunked to the API's batch limit, each request gated by the
+            # token bucket so bursts stay under the rate limit
+            fresh = []
+            for start in range(0, len(misses), EMBED_BATCH_MAX):
+                chunk = misses[start:start + EMBED_BATCH_MAX]
+                self._embed_bucket.acquire()
+                response = self.cohere_client.embed(
+                    texts=[texts[i] for i in chunk],
+                    model="embed-multilingual-v3.0",
+                    input_type="search_document",
+                    embedding_types=["float"]
+                )
+                fresh.extend(response.embeddings.float)
+            # Unit-normalize once at write time: inner product then equals
+            # cosine similarity, which is cheaper to evaluate per candidate
+            for i, embedding in zip(misses, fresh):
+                vec = np.asarray(embedding, dtype=np.float32)
+                embeddings[i] = (vec / (np.linalg.norm(vec) + 1e-12)).tolist()
+
+            # Cache for 7 days (one pipelined round-trip for all writes)
+            if use_cache:
+                pipe = self.redis_client.pipeline()
+                for i in misses:
+                    self._embedding_l1.put(cache_keys[i], embeddings[i])
+                    pipe.setex(
+                        cache_keys[i],
+                        7 * 24 * 60 * 60,
+                        np.asarray(embeddings[i], dtype=np.float16).tobytes()
+                    )
+                pipe.execute()
 
-        return embedding
+        return embeddings
+
+    def generate_embedding(self, text: str, use_cache: bool = True) -> List[float]:
+        """
+        Generate embedding vector for a single text using Cohere
+        Convenience wrapper around generate_embeddings
+        """
+        return self.generate_embeddings([text], use_cache=use_cache)[0]
 
     def store_audio(
         self,
         user_id: str,
         session_id: str,
-        audio_data: bytes,
+        audio_data: Union[bytes, BinaryIO],
         filename: str = None
     ) -> str:
         """
         Store audio file in MinIO
+        Accepts raw bytes or a readable binary stream; streams upload in
+        10 MB multipart chunks instead of buffering the whole recording
         Returns the URL to access the audio
         """
         if filename is None:
@@ -142,28 +456,54 @@ class MemoryService:
 
         try:
             # Upload audio to MinIO
-            from io import BytesIO
-            self.minio_client.put_object(
-                bucket_name,
-                object_name,
-                BytesIO(audio_data),
-                length=len(audio_data),
-                content_type='audio/wav'
-            )
+            if isinstance(audio_data, (bytes, bytearray)):
+                self.minio_client.put_object(
+                    bucket_name,
+                    object_name,
+                    BytesIO(audio_data),
+                    length=len(audio_data),
+                    content_type='audio/wav'
+                )
+            else:
+                self.minio_client.put_object(
+                    bucket_name,
+                    object_name,
+                    audio_data,
+                    length=-1,
+                    part_size=10 * 1024 * 1024,
+                    content_type='audio/wav'
+                )
 
             # Generate presigned URL (valid for 7 days)
-            from datetime import timedelta
-            url = self.minio_client.presigned_get_object(
-                bucket_name,
-                object_name,
-                expires=timedelta(days=7)
-            )
-            return url
+            return self.get_audio_url(object_name, bucket_name)
 
         except S3Error as e:
             print(f"Error uploading audio: {e}")
             raise
 
+    def get_audio_url(
+        self,
+        object_name: str,
+        bucket_name: str = "audio-recordings"
+    ) -> str:
+        """
+        Get a presigned GET URL for a stored audio object
+        Cached in Redis for 6 days so repeat lookups skip the signing work
+        and always hand out a URL with at least a day of validity left
+        """
+        cache_key = f"audio_url:{bucket_name}/{object_name}"
+        cached = self.redis_client.get(cache_key)
+        if cached:
+            return cached.decode()
+
+        url = self.minio_client.presigned_get_object(
+            bucket_name,
+            object_name,
+            expires=timedelta(days=7)
+        )
+        self.redis_client.setex(cache_key, 6 * 24 * 60 * 60, url)
+        return url
+
     def create_conversation(
         self,
         user_id: str,
@@ -171,24 +511,26 @@ class MemoryService:
         metadata: Dict = None
     ) -> str:
         """Create a new conversation session"""
-        with self.pg_conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with self._conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute("""
                 INSERT INTO conversations (user_id, session_id, metadata)
                 VALUES (%s, %s, %s)
                 RETURNING id
-            """, (user_id, session_id, json.dumps(metadata or {})))
+            """, (user_id, session_id, Json(metadata or {})))
 
             conversation_id = cur.fetchone()['id']
-            self.pg_conn.commit()
+            conn.commit()
 
-            # Cache active session in Redis
+            # Cache active session in Redis (hset + expire in one round-trip)
             session_key = f"session:{session_id}"
-            self.redis_client.hset(session_key, mapping={
+            pipe = self.redis_client.pipeline()
+            pipe.hset(session_key, mapping={
                 'user_id': user_id,
                 'conversation_id': str(conversation_id),
                 'started_at': datetime.now().isoformat()
             })
-            self.redis_client.expire(session_key, 3600)  # 1 hour TTL
+            pipe.expire(session_key, 3600)  # 1 hour TTL
+            pipe.execute()
 
             return str(conversation_id)
 
@@ -207,7 +549,7 @@ class MemoryService:
         # Generate embedding
         embedding = self.generate_embedding(content)
 
-        with self.pg_conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with self._conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute("""
                 INSERT INTO messages (
                     conversation_id,
@@ -217,19 +559,19 @@ class MemoryService:
                     embedding,
                     metadata
                 )
-                VALUES (%s, %s, %s, %s, %s::vector, %s)
+                VALUES (%s, %s, %s, %s, %s, %s)
                 RETURNING id, created_at
             """, (
                 conversation_id,
                 role,
                 content,
                 audio_url,
-                embedding,
-                json.dumps(metadata or {})
+                HalfVector(embedding),
+                Json(metadata or {})
             ))
 
             result = cur.fetchone()
-            self.pg_conn.commit()
+            conn.commit()
 
             return {
                 'message_id': str(result['id']),
@@ -252,26 +594,32 @@ class MemoryService:
         # For now, store the entire content as a fact
         facts = [content]  # Replace with actual extraction logic
 
-        fact_ids = []
-        for fact_content in facts:
-            embedding = self.generate_embedding(fact_content)
-
-            with self.pg_conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("""
-                    INSERT INTO memory_facts (
-                        user_id,
-                        fact_type,
-                        content,
-                        embedding,
-                        source_message_id
-                    )
-                    VALUES (%s, %s, %s, %s::vector, %s)
-                    RETURNING id
-                """, (user_id, fact_type, fact_content, embedding, message_id))
+        # One batched API/cache round-trip for all facts
+        embeddings = self.generate_embeddings(facts)
 
-                fact_id = cur.fetchone()['id']
-                self.pg_conn.commit()
-                fact_ids.append(str(fact_id))
+        # Insert all facts in a single statement and commit once
+        rows = [
+            (user_id, fact_type, fact_content, HalfVector(embedding), message_id)
+            for fact_content, embedding in zip(facts, embeddings)
+        ]
+
+        with self._conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            # fetch=True collects RETURNING rows across execute_values'
+            # internal pages; a bare fetchall() only sees the last page
+            returned = execute_values(cur, """
+                INSERT INTO memory_facts (
+                    user_id,
+                    fact_type,
+                    content,
+                    embedding,
+                    source_message_id
+                )
+                VALUES %s
+                RETURNING id
+            """, rows, template="(%s, %s, %s, %s, %s)", fetch=True)
+
+            fact_ids = [str(row['id']) for row in returned]
+            conn.commit()
 
         return fact_ids
 
@@ -287,8 +635,9 @@ class MemoryService:
         Find similar memories using vector similarity search
         Uses hybrid approach: cache -> vector search -> graph traversal
         """
-        # Create query hash for caching
-        query_hash = hashlib.md5(f"{query}:{user_id}".encode()).hexdigest()
+        # Create query hash for caching (hash the parts directly,
+        # no intermediate f-string allocation)
+        query_hash = _hash_key(user_id.encode() + b"\0" + query.encode())
         cache_key = f"query:{query_hash}"
 
         # Check cache first
@@ -300,16 +649,21 @@ class MemoryService:
         # Generate query embedding
         query_embedding = self.generate_embedding(query)
 
-        # Perform vector similarity search
-        with self.pg_conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT * FROM find_similar_facts(
-                    %s::vector,
-                    %s,
-                    %s,
-                    %s
-                )
-            """, (query_embedding, user_id, threshold, limit))
+        # Semantic cache: a paraphrase of a recently cached query can reuse
+        # its results even though the exact hash differs
+        if use_cache:
+            cached_memories = self._semantic_cache_lookup(user_id, query_embedding)
+            if cached_memories is not None:
+                self._update_facts_access([m['id'] for m in cached_memories])
+                return cached_memories
+
+        # Perform vector similarity search (server-side prepared plan)
+        with self._conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            self._ensure_prepared(conn)
+            cur.execute(
+                "EXECUTE find_facts (%s, %s, %s, %s)",
+                (HalfVector(query_embedding), user_id, threshold, limit)
+            )
 
             results = cur.fetchall()
 
@@ -325,58 +679,111 @@ class MemoryService:
             for row in results
         ]
 
-        # Cache results for 1 hour
+        # Cache results for 1 hour and register the query embedding in the
+        # per-user semantic cache (one pipelined round-trip)
         if use_cache:
-            self.redis_client.setex(
-                cache_key,
-                3600,
-                json.dumps(memories)
+            sem_key = f"semcache:{user_id}"
+            pipe = self.redis_client.pipeline()
+            pipe.setex(cache_key, 3600, json.dumps(memories))
+            pipe.hset(
+                sem_key,
+                query_hash,
+                np.asarray(query_embedding, dtype=np.float16).tobytes()
             )
+            pipe.expire(sem_key, 3600)
+            pipe.execute()
 
         # Update access tracking
-        for memory in memories:
-            self._update_fact_access(memory['id'])
+        self._update_facts_access([m['id'] for m in memories])
 
         return memories
 
-    def _update_fact_access(self, fact_id: str):
-        """Update fact access count and timestamp"""
-        with self.pg_conn.cursor() as cur:
-            cur.execute("SELECT update_fact_access(%s)", (fact_id,))
-            self.pg_conn.commit()
+    def _semantic_cache_lookup(
+        self,
+        user_id: str,
+        query_embedding: List[float]
+    ) -> Optional[List[Dict]]:
+        """
+        Look up cached results for a semantically equivalent recent query
+        Compares the query embedding against embeddings of recently cached
+        queries for this user and reuses their results above the threshold
+        """
+        sem_key = f"semcache:{user_id}"
+        entries = self.redis_client.hgetall(sem_key)
+        if not entries:
+            return None
+
+        # Keep the cache bounded; rebuilding is cheap
+        if len(entries) > SEMANTIC_CACHE_MAX_ENTRIES:
+            self.redis_client.delete(sem_key)
+            return None
+
+        hashes = list(entries.keys())
+        similarities = cosine_similarities(
+            query_embedding, [entries[h] for h in hashes]
+        )
+
+        best = int(np.argmax(similarities))
+        if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+            return None
+
+        cached = self.redis_client.get(f"query:{hashes[best].decode()}")
+        if cached:
+            return json.loads(cached)
+        return None
+
+    def _update_facts_access(self, fact_ids: List[str]):
+        """Update access count and timestamp for a batch of facts"""
+        if not fact_ids:
+            return
+        with self._conn() as conn, conn.cursor() as cur:
+            self._ensure_prepared(conn)
+            cur.execute("EXECUTE touch_facts (%s::uuid[])", (fact_ids,))
+            conn.commit()
 
     def get_session_context(self, session_id: str) -> Optional[Dict]:
-        """Get current session context from Redis"""
+        """Get current session context from Redis (with short-TTL L1)"""
         session_key = f"session:{session_id}"
+
+        context = self._session_l1.get(session_key)
+        if context is not None:
+            return context
+
         session_data = self.redis_client.hgetall(session_key)
 
         if not session_data:
             return None
 
-        return {
+        context = {
             k.decode(): v.decode()
             for k, v in session_data.items()
         }
+        # Short TTL: other workers may rewrite the session behind our back
+        self._session_l1.put(session_key, context, ttl=30)
+        return context
 
     def update_session_context(
         self,
         session_id: str,
         context_updates: Dict
     ):
-        """Update session context in Redis"""
+        """Update session context in Redis (hset + expire in one round-trip)"""
         session_key = f"session:{session_id}"
-        self.redis_client.hset(
+        pipe = self.redis_client.pipeline()
+        pipe.hset(
             session_key,
             mapping={
                 k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
                 for k, v in context_updates.items()
             }
         )
-        self.redis_client.expire(session_key, 3600)
+        pipe.expire(session_key, 3600)
+        pipe.execute()
+        self._session_l1.invalidate(session_key)
 
     def get_user_memory_summary(self, user_id: str) -> Dict:
         """Get summary statistics about user's memories"""
-        with self.pg_conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with self._conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute("""
                 SELECT * FROM user_memory_summary
                 WHERE user_id = %s
@@ -405,70 +812,88 @@ class MemoryService:
         Create graph nodes and relationships using Apache AGE
         Example entities: [{'type': 'Person', 'name': 'John', 'properties': {...}}]
         Example relationships: [{'type': 'MENTIONS', 'from': 'fact_id', 'to': 'person_id'}]
+        Batched: one UNWIND statement per distinct label/relationship type,
+        with properties and ids passed as Cypher parameters
         """
-        with self.pg_conn.cursor() as cur:
-            # Load AGE extension
-            cur.execute("LOAD 'age';")
-            cur.execute("SET search_path = ag_catalog, '$user', public;")
+        with self._conn() as conn, conn.cursor() as cur:
+            self._ensure_age(conn)
 
-            # Create nodes for entities
+            # Create nodes for entities, one statement per label
+            nodes_by_label: Dict[str, List[Dict]] = {}
             for entity in entities:
-                entity_type = entity['type']
-                properties = entity.get('properties', {})
+                properties = dict(entity.get('properties', {}))
                 properties['fact_id'] = fact_id
-
-                # Convert properties to AGE format
-                props_str = ', '.join(
-                    f"{k}: '{v}'" for k, v in properties.items()
+                nodes_by_label.setdefault(
+                    _graph_identifier(entity['type']), []
+                ).append(properties)
+
+            for label, rows in nodes_by_label.items():
+                cur.execute(
+                    _CYPHER_CREATE_NODES.format(label=label, param='%s'),
+                    (json.dumps({'rows': rows}),)
                 )
 
-                cypher_query = f"""
-                    SELECT * FROM cypher('memory_graph', $$
-                        CREATE (n:{entity_type} {{{props_str}}})
-                        RETURN n
-                    $$) as (n agtype);
-                """
-                cur.execute(cypher_query)
-
-            # Create relationships
+            # Create relationships, one statement per type
+            rels_by_type: Dict[str, List[Dict]] = {}
             for rel in relationships:
-                rel_type = rel['type']
-                from_id = rel['from']
-                to_id = rel['to']
-
-                cypher_query = f"""
-                    SELECT * FROM cypher('memory_graph', $$
-                        MATCH (a {{id: '{from_id}'}}), (b {{id: '{to_id}'}})
-                        CREATE (a)-[r:{rel_type}]->(b)
-                        RETURN r
-                    $$) as (r agtype);
-                """
-                cur.execute(cypher_query)
+                rels_by_type.setdefault(
+                    _graph_identifier(rel['type']), []
+                ).append({'from_id': rel['from'], 'to_id': rel['to']})
+
+            for rel_type, rows in rels_by_type.items():
+                cur.execute(
+                    _CYPHER_CREATE_RELATIONSHIPS.format(rel_type=rel_type, param='%s'),
+                    (json.dumps({'rows': rows}),)
+                )
 
-            self.pg_conn.commit()
+            conn.commit()
+
+    @classmethod
+    def _ensure_prepared(cls, conn):
+        """Prepare the hot statements once per pooled connection"""
+        if conn._stmts_prepared:
+            return
+        with conn.cursor() as cur:
+            for statement in cls._PREPARED_STATEMENTS:
+                cur.execute(statement)
+        # Commit immediately: PREPARE is transactional, and a later
+        # rollback on this connection must not deallocate the statements
+        conn.commit()
+        conn._stmts_prepared = True
+
+    @staticmethod
+    def _ensure_age(conn):
+        """
+        Load the AGE extension and set the search_path once per pooled
+        connection; both settings persist for the connection's lifetime,
+        so repeating them on every graph call just wastes round-trips
+        """
+        if conn._age_loaded:
+            return
+        with conn.cursor() as cur:
+            cur.execute("LOAD 'age';")
+            cur.execute("SET search_path = ag_catalog, '$user', public;")
+        # Commit immediately: SET is transactional, and the search_path must
+        # survive the rollback _conn() issues when the borrow ends
+        conn.commit()
+        conn._age_loaded = True
 
     def query_graph(self, cypher_query: str) -> List[Dict]:
         """
         Execute a Cypher query on the knowledge graph
         Returns results as list of dictionaries
         """
-        with self.pg_conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("LOAD 'age';")
-            cur.execute("SET search_path = ag_catalog, '$user', public;")
+        with self._conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            self._ensure_age(conn)
 
-            full_query = f"""
-                SELECT * FROM cypher('memory_graph', $$
-                    {cypher_query}
-                $$) as (result agtype);
-            """
-            cur.execute(full_query)
+            cur.execute(_CYPHER_WRAPPER.format(query=cypher_query))
             results = cur.fetchall()
 
             return [dict(row) for row in results]
 
     def close(self):
         """Close all connections"""
-        self.pg_conn.close()
+        self.pg_pool.closeall()
         self.redis_client.close()
 
 
@@ -217,6 +217,10 @@ def test_vector_similarity_search(service: MemoryService):
             "Reading science fiction novels is fascinating"
         ]
 
+        # Warm the embedding cache with a single batched API call,
+        # so the per-fact storage below hits Redis instead of Cohere
+        service.generate_embeddings(test_facts)
+
         # Store facts
         for fact in test_facts:
             msg = service.add_message(conv_id, "user", fact)